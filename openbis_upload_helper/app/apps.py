@@ -1,6 +1,35 @@
+import base64
+import binascii
+
 from django.apps import AppConfig as DjangoAppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+def check_encryption_key(key):
+    """Check that `key` is a valid Fernet key, i.e. 32 url-safe base64-encoded bytes.
+
+    The Fernet cipher is only built on the first login to keep `cryptography` out of the startup,
+    so the key is checked here to still fail at boot instead of on every login.
+
+    Args:
+        key (str): The `SECRET_ENCRYPTION_KEY` setting.
+    """
+    try:
+        decoded = base64.urlsafe_b64decode(key.encode("utf-8"))
+    except (binascii.Error, ValueError) as e:
+        raise ImproperlyConfigured(
+            f"SECRET_ENCRYPTION_KEY is not valid url-safe base64: {e}"
+        ) from e
+    if len(decoded) != 32:
+        raise ImproperlyConfigured(
+            f"SECRET_ENCRYPTION_KEY must decode to 32 bytes, got {len(decoded)}."
+        )
 
 
 class AppConfig(DjangoAppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "app"
+
+    def ready(self):
+        check_encryption_key(settings.SECRET_ENCRYPTION_KEY)
@@ -0,0 +1,224 @@
+import collections
+import datetime
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+from bam_masterdata.logger import logger
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import reverse
+
+
+class StackSampler:
+    """
+    Sampling profiler shared by all the threads of the process.
+
+    A single background thread wakes up every `interval` seconds and records the current stack of
+    each registered thread, so the profiled code runs without any tracing hooks.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = {}  # thread id -> Counter of collapsed stacks
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self, thread_id):
+        with self.lock:
+            self.samples[thread_id] = collections.Counter()
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self._run, name="profiling-sampler", daemon=True
+                )
+                self.thread.start()
+
+    def stop(self, thread_id):
+        with self.lock:
+            return self.samples.pop(thread_id, collections.Counter())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.samples:
+                    self.thread = None
+                    return
+                frames = sys._current_frames()
+                for thread_id, counter in self.samples.items():
+                    if frame := frames.get(thread_id):
+                        counter[self.collapse(frame)] += 1
+
+    @staticmethod
+    def collapse(frame):
+        """
+        Format a stack in the collapsed format used by flame graph tools (outermost frame first).
+
+        Args:
+            frame (FrameType): The innermost frame of the stack.
+
+        Returns:
+            str: The frames of the stack as `function (file:line)` joined by semicolons.
+        """
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(
+                f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+            )
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+
+class ProfileStore:
+    """Bounded ring of profile files on disk: once `max_files` are stored, the oldest is removed."""
+
+    def __init__(self, directory, max_files=50):
+        self.directory = directory
+        self.max_files = max_files
+
+    def list(self):
+        """
+        List the stored profiles, newest first.
+
+        Returns:
+            list[dict]: The metadata of each profile, with the file `name` added.
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in sorted(os.listdir(self.directory), reverse=True):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    metadata = json.load(f)["metadata"]
+            except (OSError, ValueError, KeyError):
+                continue
+            profiles.append({"name": name, **metadata})
+        return profiles
+
+    def path(self, name):
+        """
+        Path to a stored profile.
+
+        Args:
+            name (str): The file name of the profile, as returned by `list()`.
+
+        Returns:
+            str | None: The path of the profile file, or None if there is no such profile.
+        """
+        if name != os.path.basename(name) or not name.endswith(".json"):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def save(self, metadata, stacks):
+        os.makedirs(self.directory, exist_ok=True)
+        # Names sort chronologically, which is what `list()` and the pruning rely on
+        name = f"{datetime.datetime.now().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}.json"
+        tmp_path = os.path.join(self.directory, f".{name}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"metadata": metadata, "stacks": dict(stacks)}, f)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+        self.prune()
+        return name
+
+    def prune(self):
+        names = sorted(
+            name for name in os.listdir(self.directory) if name.endswith(".json")
+        )
+        for name in names[: max(len(names) - self.max_files, 0)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass  # already pruned by another worker
+
+
+class ProfilingMiddleware:
+    """
+    Profile a selection of requests with the `StackSampler` and store the results in a
+    `ProfileStore`. A request is profiled when:
+
+    - it is a request to the homepage, picked with probability `PROFILING_SAMPLE_RATE`,
+    - it carries the `PROFILING_HEADER` header set to `PROFILING_TOKEN`, or
+    - it takes longer than `PROFILING_LATENCY_THRESHOLD` seconds (if set, all requests are sampled
+      and only the slow ones are kept).
+
+    The middleware removes itself from the chain if `PROFILING_ENABLED` is not set.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.latency_threshold = settings.PROFILING_LATENCY_THRESHOLD
+        self.header = f"HTTP_{settings.PROFILING_HEADER.upper().replace('-', '_')}"
+        self.token = settings.PROFILING_TOKEN
+        self.sampler = StackSampler(settings.PROFILING_INTERVAL)
+        self.store = ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_FILES)
+        self._homepage_path = None
+
+    @property
+    def homepage_path(self):
+        if self._homepage_path is None:
+            self._homepage_path = reverse("homepage")
+        return self._homepage_path
+
+    def reason(self, request):
+        token = request.META.get(self.header)
+        # Compare bytes: `compare_digest` rejects non-ASCII strings
+        if (
+            token
+            and self.token
+            and hmac.compare_digest(token.encode(), self.token.encode())
+        ):
+            return "header"
+        if (
+            self.sample_rate
+            and request.path_info == self.homepage_path
+            and random.random() < self.sample_rate
+        ):
+            return "sample"
+        if self.latency_threshold:
+            return "latency"
+        return None
+
+    def __call__(self, request):
+        reason = self.reason(request)
+        if reason is None:
+            return self.get_response(request)
+
+        thread_id = threading.get_ident()
+        start = time.perf_counter()
+        self.sampler.start(thread_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = self.sampler.stop(thread_id)
+        duration = time.perf_counter() - start
+
+        if reason == "latency" and duration < self.latency_threshold:
+            return response
+        metadata = {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "method": request.method,
+            "path": request.path,
+            "view": getattr(request.resolver_match, "view_name", None),
+            "status": response.status_code,
+            "duration": round(duration, 4),
+            "reason": reason,
+            "interval": self.sampler.interval,
+            "samples": sum(stacks.values()),
+        }
+        try:
+            self.store.save(metadata, stacks)
+        except OSError as e:
+            logger.warning(f"Could not store profile for {request.path}: {e}")
+        return response
@@ -6,4 +6,6 @@ urlpatterns = [
     path("", views.homepage, name="homepage"),
     path("login/", views.login, name="login"),
     path("logout/", views.logout_view, name="logout"),
+    path("profiles/", views.profiles, name="profiles"),
+    path("profiles/<str:name>", views.download_profile, name="download_profile"),
 ]
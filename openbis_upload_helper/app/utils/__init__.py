@@ -1,3 +1,4 @@
+from .pipeline import ParserPipeline, iter_parsed_files, stream_parser
 from .utils import (
     FileLoader,
     FileRemover,
@@ -8,3 +9,4 @@ from .utils import (
     log_results,
     preload_context_request,
 )
+from .verification import StreamingChecksum, UploadVerifier, compare_file
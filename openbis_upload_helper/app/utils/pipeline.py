@@ -0,0 +1,293 @@
+import os
+import queue
+import threading
+
+from bam_masterdata.logger import logger
+from django.conf import settings
+
+# Marks the end of the parsed files in the queue
+_DONE = object()
+
+
+def iter_parsed_files(files_parser):
+    """Parse the files lazily, one at a time, each into its own collection.
+
+    Args:
+        files_parser (dict): Parser instances mapped to the list of file paths they parse.
+
+    Yields:
+        tuple: The parser, the file path and the `CollectionType` populated with the parsed objects.
+    """
+    from bam_masterdata.metadata.entities import CollectionType  # noqa: PLC0415
+
+    for parser, files in files_parser.items():
+        for file in files:
+            collection = CollectionType()
+            parser.parse([file], collection, logger=logger)
+            yield parser, file, collection
+
+
+class ParserPipeline:
+    """Stream the parsed objects from the parsers to openBIS.
+
+    The files are parsed one at a time in the calling thread, and the resulting collections flow
+    through a bounded queue to the writer running in a background thread. When the writer falls
+    behind, the parser blocks on the full queue, so the parsed objects held in memory are set by
+    `queue_size` and not by the number of files. Parsing stays in the calling thread so that it
+    shows up in the request profiles.
+
+    Relationships are linked between the objects parsed from the same file. The files themselves
+    are uploaded at the end, in one dataset per parser, as `bam_masterdata`'s `run_parser` does.
+    Unlike `run_parser`, an error on one file leaves the objects of the files before it in
+    openBIS: their files are uploaded and logged before the error is re-raised.
+    """
+
+    def __init__(
+        self,
+        openbis,
+        files_parser,
+        space_name="",
+        project_name="PROJECT",
+        collection_name="",
+        queue_size=None,
+    ):
+        self.openbis = openbis
+        self.files_parser = files_parser
+        self.space_name = space_name
+        self.project_name = project_name
+        self.collection_name = collection_name
+        self.queue = queue.Queue(maxsize=queue_size or settings.PARSER_QUEUE_SIZE)
+        self.stop = threading.Event()
+        self.error = None
+        self.written_files = {}  # parser -> file paths written so far
+        self.datasets = []  # (dataset, file paths) saved in openBIS
+
+    def run(self):
+        """Parse the files and write the parsed objects and the files to openBIS.
+
+        Returns:
+            list: The `(dataset, files)` saved in openBIS.
+        """
+        if not self.project_name:
+            logger.error("The Project name must be specified for the parser to run.")
+            return self.datasets
+        if not self.files_parser:
+            logger.error(
+                "No files or parsers to parse. Please provide valid file paths or contact an Admin to add missing parser."
+            )
+            return self.datasets
+        if not self._resolve_targets():
+            return self.datasets
+
+        writer = threading.Thread(
+            target=self._consume, name="openbis-writer", daemon=True
+        )
+        writer.start()
+        error = None
+        try:
+            for item in iter_parsed_files(self.files_parser):
+                if not self._put(item):
+                    break  # the writer failed
+        except Exception as e:
+            error = e
+        finally:
+            self._put(_DONE)
+            writer.join()
+        error = error or self.error
+
+        # The objects of the files written before an error stay in openBIS, so their files are
+        # uploaded as well
+        self._upload_datasets()
+        if error:
+            written = [
+                os.path.basename(file)
+                for files in self.written_files.values()
+                for file in files
+            ]
+            logger.error(
+                f"Upload stopped by an error after writing the objects of {len(written)} "
+                f"file(s) to openBIS: {written}"
+            )
+            raise error
+        return self.datasets
+
+    def _put(self, item):
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _consume(self):
+        try:
+            while (item := self.queue.get()) is not _DONE:
+                parser, file, collection = item
+                self._write_objects(collection)
+                self.written_files.setdefault(parser, []).append(file)
+        except Exception as e:
+            self.error = e
+        finally:
+            # Unblock the parser if the writer failed
+            self.stop.set()
+
+    def _resolve_targets(self):
+        openbis = self.openbis
+        try:
+            space = openbis.get_space(self.space_name)
+        except Exception:
+            space = None
+        # If space is not found, use the user space
+        if space is None:
+            for s in openbis.get_spaces():
+                if s.code.endswith(openbis.username.upper()):
+                    space = s
+                    logger.warning(
+                        f"Space {self.space_name} does not exist in openBIS. "
+                        f"Loading space for {openbis.username}."
+                    )
+                    break
+            if space is None:
+                logger.error(
+                    f"No usable Space for {openbis.username} in openBIS. Please create it first or notify an Admin."
+                )
+                return False
+        self.space = space
+
+        if self.project_name.upper() in [p.code for p in space.get_projects()]:
+            project = space.get_project(self.project_name)
+        else:
+            logger.info("Replacing project code with uppercase and underscores.")
+            project = space.new_project(
+                code=self.project_name.replace(" ", "_").upper(),
+                description="New project created via automated parsing with `bam_masterdata`.",
+            )
+        project.save()
+        self.project = project
+
+        if not self.collection_name:
+            logger.info(
+                "No Collection name specified. Attaching objects directly to Project."
+            )
+            self.collection_openbis = None
+            return True
+        if self.collection_name.upper() in [c.code for c in project.get_collections()]:
+            collection_openbis = space.get_collection(
+                f"/{self.space_name}/{self.project_name}/{self.collection_name}".upper()
+            )
+        else:
+            logger.info("Replacing collection code with uppercase and underscores.")
+            collection_openbis = openbis.new_collection(
+                code=self.collection_name.replace(" ", "_").upper(),
+                type="DEFAULT_EXPERIMENT",
+                project=self.project,
+            )
+        collection_openbis.save()
+        self.collection_openbis = collection_openbis
+        return True
+
+    def _write_objects(self, collection):
+        from bam_masterdata.metadata.entities import (  # noqa: PLC0415
+            PropertyTypeAssignment,
+        )
+
+        openbis_id_map = {}
+        for object_id, object_instance in collection.attached_objects.items():
+            # Map PropertyTypeAssignment to pybis props dictionary
+            obj_props = {}
+            for key in object_instance._properties.keys():
+                value = getattr(object_instance, key, None)
+                if value is None or isinstance(value, PropertyTypeAssignment):
+                    continue
+                obj_props[object_instance._property_metadata[key].code.lower()] = value
+
+            if not object_instance.code:
+                if self.collection_openbis is None:
+                    object_openbis = self.openbis.new_object(
+                        type=object_instance.defs.code,
+                        space=self.space,
+                        project=self.project,
+                        props=obj_props,
+                    )
+                else:
+                    object_openbis = self.openbis.new_object(
+                        type=object_instance.defs.code,
+                        space=self.space,
+                        project=self.project,
+                        collection=self.collection_openbis,
+                        props=obj_props,
+                    )
+            else:
+                identifier = (
+                    f"/{self.space_name}/{self.project_name}/{object_instance.code}"
+                    if not self.collection_name
+                    else f"/{self.space_name}/{self.project_name}/{self.collection_name}/{object_instance.code}"
+                )
+                object_openbis = self.space.get_object(identifier)
+                object_openbis.set_props(obj_props)
+                logger.info(
+                    f"Object {identifier} already exists in openBIS, updating properties."
+                )
+            object_openbis.save()
+            openbis_id_map[object_id] = object_openbis.identifier
+
+        # Map parent-child relationships
+        for parent_id, child_id in collection.relationships.values():
+            if parent_id in openbis_id_map and child_id in openbis_id_map:
+                child_openbis = self.openbis.get_object(openbis_id_map[child_id])
+                child_openbis.add_parents(openbis_id_map[parent_id])
+                child_openbis.save()
+                logger.info(
+                    f"Linked child {openbis_id_map[child_id]} to parent {openbis_id_map[parent_id]} in collection {self.collection_name}."
+                )
+
+    def _upload_datasets(self):
+        for files in self.written_files.values():
+            try:
+                if self.collection_openbis is None:
+                    # ! This won't work on a project -> datasets only attached to collections in pyBIS
+                    dataset = self.openbis.new_dataset(
+                        type="RAW_DATA", files=files, project=self.project
+                    )
+                else:
+                    dataset = self.openbis.new_dataset(
+                        type="RAW_DATA", files=files, collection=self.collection_openbis
+                    )
+                dataset.save()
+                self.datasets.append((dataset, files))
+            except Exception as e:
+                logger.warning(f"Error uploading files {files} to openBIS: {e}")
+                continue
+            logger.info(f"Files uploaded to openBIS collection {self.collection_name}.")
+
+
+def stream_parser(
+    openbis=None,
+    files_parser={},
+    space_name="",
+    project_name="PROJECT",
+    collection_name="",
+):
+    """Drop-in replacement for `bam_masterdata`'s `run_parser` with bounded memory.
+
+    Args:
+        openbis (Openbis): An instance of the Openbis class from pyBIS, already logged in.
+        files_parser (dict): Parser instances mapped to the list of file paths they parse.
+        space_name (str): The space in openBIS where the entities will be stored.
+        project_name (str): The project in openBIS where the entities will be stored.
+        collection_name (str): The collection in openBIS where the entities will be stored.
+
+    Returns:
+        list: The `(dataset, files)` saved in openBIS.
+    """
+    if openbis is None:
+        logger.error("An instance of Openbis must be provided for the parser to run.")
+        return []
+    return ParserPipeline(
+        openbis,
+        files_parser,
+        space_name=space_name,
+        project_name=project_name,
+        collection_name=collection_name,
+    ).run()
@@ -1,4 +1,5 @@
 import datetime
+import functools
 import os
 import shutil
 import tarfile
@@ -7,27 +8,46 @@ import uuid
 import zipfile
 
 from bam_masterdata.logger import log_storage, logger
-from cryptography.fernet import Fernet, InvalidToken
 from django.conf import settings
 from django.core.cache import cache
-from pybis import Openbis
 
 from openbis_upload_helper.uploader.entry_points import get_entry_point_parsers
 
-# Instantiate the Fernet class with the secret key
-cipher_suite = Fernet(settings.SECRET_ENCRYPTION_KEY)
+from .verification import StreamingChecksum
+
+# Size of the chunks read from the archives while extracting them
+CHUNK_SIZE = 64 * 1024
+
+
+@functools.cache
+def get_cipher_suite():
+    """Instantiate the Fernet class with the secret key on first use.
+
+    `cryptography` is only imported here so that worker startup and `manage.py` commands do not
+    pay for it until a password is actually encrypted or decrypted.
+
+    Returns:
+        Fernet: The cipher used to encrypt and decrypt the openBIS passwords stored in the session.
+    """
+    from cryptography.fernet import Fernet  # noqa: PLC0415
+
+    return Fernet(settings.SECRET_ENCRYPTION_KEY)
 
 
 # Encrypt the password
 def encrypt_password(plain_text_password):
-    encrypted_password = cipher_suite.encrypt(plain_text_password.encode("utf-8"))
+    encrypted_password = get_cipher_suite().encrypt(plain_text_password.encode("utf-8"))
     return encrypted_password.decode("utf-8")  # Return as a string
 
 
 def decrypt_password(encrypted_password):
+    from cryptography.fernet import InvalidToken  # noqa: PLC0415
+
     try:
         # Remove the manual padding correction, Fernet handles it automatically
-        decrypted_password = cipher_suite.decrypt(encrypted_password.encode("utf-8"))
+        decrypted_password = get_cipher_suite().decrypt(
+            encrypted_password.encode("utf-8")
+        )
         return decrypted_password.decode("utf-8")
     except InvalidToken as e:
         logger.error(f"Decryption failed: {str(e)}")
@@ -48,6 +68,8 @@ def get_openbis_from_cache(request):
     username = request.session.get("openbis_username")
     encrypted_password = request.session.get("openbis_password")
     if username and encrypted_password:
+        from pybis import Openbis  # noqa: PLC0415
+
         password = decrypt_password(encrypted_password)
         o = Openbis(settings.OPENBIS_URL)
         o.login(username, password, save_token=True)
@@ -86,6 +108,7 @@ class FileLoader:
         self.selected_files = selected_files
         self.saved_file_names = []
         self.temp_dirs = []  # List to keep track of temporary directories
+        self.checksums = {}  # Checksums of the selected files, keyed by their path
 
     def load_files(self):
         if not self.uploaded_files:
@@ -117,8 +140,12 @@ class FileLoader:
                 if not zip_info.is_dir():
                     target_path = os.path.join(tmp_dir, zip_info.filename)
                     os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                    with open(target_path, "wb") as out_file:
-                        out_file.write(zip_ref.read(zip_info.filename))
+                    with zip_ref.open(zip_info) as member:
+                        self._write_file(
+                            zip_info.filename,
+                            target_path,
+                            iter(lambda: member.read(CHUNK_SIZE), b""),
+                        )
                     if zip_info.filename in self.selected_files:
                         self.saved_file_names.append((zip_info.filename, target_path))
 
@@ -139,8 +166,11 @@ class FileLoader:
                         if extracted_file := tar_ref.extractfile(member):
                             target_path = os.path.join(tmp_dir, member.name)
                             os.makedirs(os.path.dirname(target_path), exist_ok=True)
-                            with open(target_path, "wb") as out_file:
-                                out_file.write(extracted_file.read())
+                            self._write_file(
+                                member.name,
+                                target_path,
+                                iter(lambda: extracted_file.read(CHUNK_SIZE), b""),
+                            )
                             if member.name in self.selected_files:
                                 self.saved_file_names.append((member.name, target_path))
 
@@ -152,12 +182,22 @@ class FileLoader:
         tmp_dir = tempfile.mkdtemp()
         self.temp_dirs.append(tmp_dir)
         target_path = os.path.join(tmp_dir, uploaded_file.name)
-        with open(target_path, "wb") as f:
-            for chunk in uploaded_file.chunks():
-                f.write(chunk)
+        self._write_file(uploaded_file.name, target_path, uploaded_file.chunks())
         if uploaded_file.name in self.selected_files:
             self.saved_file_names.append((uploaded_file.name, target_path))
 
+    def _write_file(self, file_name, target_path, chunks):
+        # The checksums of the selected files are computed while writing them, so that the upload
+        # can be verified later without reading the files again
+        checksum = StreamingChecksum() if file_name in self.selected_files else None
+        with open(target_path, "wb") as out_file:
+            for chunk in chunks:
+                out_file.write(chunk)
+                if checksum:
+                    checksum.update(chunk)
+        if checksum:
+            self.checksums[target_path] = checksum.to_dict()
+
 
 class FilesParser:
     def __init__(self, uploaded_files, available_parsers, o):
@@ -199,7 +239,7 @@ class FileRemover:
         self.uploaded_files.clear()
 
 
-def log_results(request, parsed_files={}, context={}):
+def log_results(request, parsed_files={}, context={}, extra_logs=[]):
     log_storage.clear()
     for parser, paths in parsed_files.items():
         for path in paths:
@@ -210,6 +250,7 @@ def log_results(request, parsed_files={}, context={}):
                     "level": "info",
                 }
             )
+    log_storage.extend(extra_logs)
     # format logs
     context_logs = []
     for log in log_storage:
@@ -0,0 +1,170 @@
+import datetime
+import hashlib
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from bam_masterdata.logger import logger
+from django.conf import settings
+
+
+class StreamingChecksum:
+    """Size, CRC32 and SHA-256 of a file, updated chunk by chunk while the file is written."""
+
+    def __init__(self):
+        self.size = 0
+        self.crc32 = 0
+        self.sha256 = hashlib.sha256()
+
+    def update(self, chunk):
+        self.size += len(chunk)
+        self.crc32 = zlib.crc32(chunk, self.crc32)
+        self.sha256.update(chunk)
+
+    def to_dict(self):
+        return {
+            "size": self.size,
+            # same format as the CRC32 checksums reported by pyBIS
+            "crc32": f"{self.crc32 & 0xFFFFFFFF:x}",
+            "sha256": self.sha256.hexdigest(),
+        }
+
+
+def compare_file(local, remote):
+    """Compare the checksums computed while staging a file with the ones reported by the datastore.
+
+    The strongest check available is used: SHA-256 if the datastore reports it, then CRC32, and
+    the file size otherwise.
+
+    Args:
+        local (dict): The `size`, `crc32` and `sha256` of the staged file.
+        remote (dict): The `fileLength`, `checksumCRC32`, `checksum` and `checksumType` reported
+            by the datastore for the file.
+
+    Returns:
+        tuple[bool, str]: Whether the file matches, and the method used to compare it.
+    """
+    checksum_type = (remote.get("checksumType") or "").replace("-", "").upper()
+    checksum = (remote.get("checksum") or "").lower()
+    if checksum_type == "SHA256" and checksum:
+        return checksum.removeprefix("sha256:") == local["sha256"], "sha256"
+    # pyBIS reports a missing CRC32 as 0
+    crc32 = remote.get("checksumCRC32")
+    if crc32 and crc32 != "0":
+        return crc32 == local["crc32"], "crc32"
+    # Only a missing length is unknown: empty files have a length (and CRC32) of 0
+    length = remote.get("fileLength")
+    return length is not None and int(length) == local["size"], "size"
+
+
+class UploadVerifier:
+    def __init__(self, datasets, checksums, files=None, max_workers=None):
+        """
+        Args:
+            datasets (list): The `(dataset, files)` saved in openBIS, `files` being the local paths.
+            checksums (dict): The checksums computed by `FileLoader`, keyed by local path.
+            files (list, optional): The local paths of all the staged files, so that the files
+                whose dataset was not saved are reported too. Defaults to the keys of `checksums`.
+            max_workers (int, optional): Number of datasets verified concurrently.
+        """
+        self.datasets = datasets
+        self.checksums = checksums
+        self.files = list(checksums) if files is None else files
+        self.max_workers = max_workers or settings.VERIFY_WORKERS
+        self.results = []
+
+    def verify(self):
+        """Compare every uploaded file with what the datastore reports, one dataset per worker.
+
+        Returns:
+            list[dict]: The `file`, `dataset`, `status` (`ok`, `mismatch`, `missing`, `unverified`
+                or `error`) and `detail` (comparison method or error message) of each file.
+        """
+        if self.datasets:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(self.datasets))
+            ) as executor:
+                for results in executor.map(self._verify_dataset, self.datasets):
+                    self.results.extend(results)
+        # Files left out of the saved datasets, e.g. because saving their dataset failed
+        uploaded = {path for _, files in self.datasets for path in files}
+        self.results.extend(
+            self._result(path, "no dataset", "missing")
+            for path in self.files
+            if path not in uploaded
+        )
+        return self.results
+
+    def _verify_dataset(self, item):
+        dataset, files = item
+        dataset_id = getattr(dataset, "permId", None) or "dataset"
+        try:
+            listing = dataset.get_dataset_files().df
+        except Exception as e:
+            logger.error(f"Could not list the files of {dataset_id}: {e}")
+            return [self._result(path, dataset_id, "error", str(e)) for path in files]
+        remote_files = {
+            os.path.basename(row["path"]): row
+            for row in listing.to_dict("records")
+            if not row.get("directory")
+        }
+
+        results = []
+        for path in files:
+            local = self.checksums.get(path)
+            remote = remote_files.get(os.path.basename(path))
+            if remote is None:
+                results.append(self._result(path, dataset_id, "missing"))
+            elif local is None:
+                results.append(self._result(path, dataset_id, "unverified"))
+            else:
+                matches, method = compare_file(local, remote)
+                status = "ok" if matches else "mismatch"
+                results.append(self._result(path, dataset_id, status, method))
+        return results
+
+    @staticmethod
+    def _result(path, dataset_id, status, detail=""):
+        return {
+            "file": os.path.basename(path),
+            "dataset": dataset_id,
+            "status": status,
+            "detail": detail,
+        }
+
+    def logs(self):
+        """Summarize the results as log entries, in the format of `log_storage`.
+
+        Returns:
+            list[dict]: The `event`, `timestamp` and `level` of each entry.
+        """
+        timestamp = datetime.datetime.now().isoformat()
+        logs = []
+        verified = [r for r in self.results if r["status"] == "ok"]
+        if verified:
+            methods = ", ".join(sorted({r["detail"] for r in verified}))
+            logs.append(
+                {
+                    "event": f"Verified {len(verified)} file(s) against the datastore ({methods}).",
+                    "timestamp": timestamp,
+                    "level": "info",
+                }
+            )
+        messages = {
+            "mismatch": "does not match the uploaded file ({detail})",
+            "missing": "is missing in the datastore",
+            "unverified": "could not be verified: no checksum was computed while uploading",
+            "error": "could not be verified: {detail}",
+        }
+        for result in self.results:
+            if result["status"] == "ok":
+                continue
+            message = messages[result["status"]].format(detail=result["detail"])
+            logs.append(
+                {
+                    "event": f"[{result['dataset']}] {result['file']} {message}",
+                    "timestamp": timestamp,
+                    "level": "warning" if result["status"] == "unverified" else "error",
+                }
+            )
+        return logs
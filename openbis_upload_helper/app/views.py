@@ -5,23 +5,26 @@ import tempfile
 import uuid
 import zipfile
 
-from bam_masterdata.cli.cli import run_parser
 from bam_masterdata.logger import logger
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import logout
 from django.core.cache import cache
+from django.http import FileResponse, Http404
 from django.shortcuts import redirect, render
 from django.views.decorators.http import require_POST
-from pybis import Openbis
 
+from .middleware import ProfileStore
 from .utils import (
     FileLoader,
     FileRemover,
     FilesParser,
+    UploadVerifier,
     encrypt_password,
     get_openbis_from_cache,
     log_results,
     preload_context_request,
+    stream_parser,
 )
 
 
@@ -32,6 +35,9 @@ def login(request):
         username = request.POST.get("username")
         password = request.POST.get("password")
         try:
+            # `pybis` is heavy to import, so it is only loaded when a user logs in
+            from pybis import Openbis  # noqa: PLC0415
+
             o = Openbis(settings.OPENBIS_URL)
             o.login(username, password, save_token=True)
             encrypted_password = encrypt_password(password)
@@ -69,7 +75,7 @@ def homepage(request):
 
     # Reset session if requested with button
     if request.method == "GET" and "reset" in request.GET:
-        for key in ["uploaded_files", "checker_logs"]:
+        for key in ["uploaded_files", "file_checksums", "checker_logs"]:
             request.session.pop(key, None)
         return redirect("homepage")
 
@@ -94,6 +100,7 @@ def homepage(request):
             request.session["project_name"] = project_name
             request.session["collection_name"] = collection_name
             request.session["uploaded_files"] = saved_file_names
+            request.session["file_checksums"] = file_loader.checksums
             request.session["parsers_assigned"] = False
             request.session.pop("checker_logs", None)
             return redirect("homepage")
@@ -120,19 +127,30 @@ def homepage(request):
             files_parser_class = FilesParser(uploaded_files, available_parsers, o)
             parsed_files, files_parser = files_parser_class.assign_parsers(request)
 
-            run_parser(
+            # parse and write the files one at a time to bound the memory used
+            datasets = stream_parser(
                 openbis=o,
                 files_parser=files_parser,
                 project_name=request.session.get("project_name", ""),
                 collection_name=request.session.get("collection_name", ""),
                 space_name=request.session.get("selected_space"),
             )
+            # compare what reached the datastore with what was uploaded
+            verifier = UploadVerifier(
+                datasets,
+                request.session.pop("file_checksums", {}),
+                files=[path for _, path in uploaded_files],
+            )
+            verifier.verify()
+
             # remove temporary directories
             file_remover = FileRemover(uploaded_files)
             file_remover.cleanup()
 
             # save Logs
-            context_logs = log_results(request, parsed_files, context)
+            context_logs = log_results(
+                request, parsed_files, context, extra_logs=verifier.logs()
+            )
 
             context["logs"] = context_logs
             request.session["checker_logs"] = context_logs
@@ -163,3 +181,24 @@ def homepage(request):
 def clear_state(request):
     request.session.pop("checker_logs", None)
     return redirect("homepage")
+
+
+def get_profile_store():
+    return ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_FILES)
+
+
+@staff_member_required
+def profiles(request):
+    context = {
+        "profiling_enabled": settings.PROFILING_ENABLED,
+        "profiles": get_profile_store().list(),
+    }
+    return render(request, "profiles.html", context)
+
+
+@staff_member_required
+def download_profile(request, name):
+    path = get_profile_store().path(name)
+    if not path:
+        raise Http404(f"Profile {name} not found.")
+    return FileResponse(open(path, "rb"), as_attachment=True, filename=name)
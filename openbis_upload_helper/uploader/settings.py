@@ -29,6 +29,12 @@ SECRET_ENCRYPTION_KEY = environ("SECRET_ENCRYPTION_KEY")
 
 OPENBIS_URL = "https://devel.datastore.bam.de/"
 
+# Number of parsed files buffered between the parsers and the openBIS writer
+PARSER_QUEUE_SIZE = environ("PARSER_QUEUE_SIZE", default=4, cast=int)
+
+# Number of datasets verified concurrently against the datastore after an upload
+VERIFY_WORKERS = environ("VERIFY_WORKERS", default=4, cast=int)
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = environ("DEBUG", default=False, cast=bool)
 
@@ -58,6 +64,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "app.middleware.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -68,6 +75,21 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Opt-in request profiling (see `app.middleware.ProfilingMiddleware`)
+PROFILING_ENABLED = environ("PROFILING_ENABLED", default=False, cast=bool)
+# Fraction of the requests to the homepage that are profiled
+PROFILING_SAMPLE_RATE = environ("PROFILING_SAMPLE_RATE", default=0.0, cast=float)
+# Keep the profile of any request slower than this (in seconds, 0 to disable)
+PROFILING_LATENCY_THRESHOLD = environ(
+    "PROFILING_LATENCY_THRESHOLD", default=0.0, cast=float
+)
+# Requests carrying this header set to `PROFILING_TOKEN` are always profiled
+PROFILING_HEADER = "X-Profile-Token"
+PROFILING_TOKEN = environ("PROFILING_TOKEN", default="")
+PROFILING_INTERVAL = environ("PROFILING_INTERVAL", default=0.005, cast=float)
+PROFILING_DIR = environ("PROFILING_DIR", default=str(BASE_DIR / "profiles"))
+PROFILING_MAX_FILES = environ("PROFILING_MAX_FILES", default=50, cast=int)
+
 CSRF_TRUSTED_ORIGINS = environ(
     "CSRF_TRUSTED_ORIGINS", default=[], cast=lambda v: [s.strip() for s in v.split(",")]
 )
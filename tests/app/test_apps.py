@@ -0,0 +1,13 @@
+import pytest
+from app.apps import check_encryption_key
+from django.core.exceptions import ImproperlyConfigured
+
+
+def test_check_encryption_key():
+    check_encryption_key("x1_JDNmuikh7MQFzIQJFvmJDFbeOsacJRvvvwq3xv6a=")
+
+
+@pytest.mark.parametrize("key", ["", "not base64!", "c2hvcnQ="])
+def test_check_encryption_key_invalid(key):
+    with pytest.raises(ImproperlyConfigured):
+        check_encryption_key(key)
@@ -0,0 +1,130 @@
+import json
+import time
+from unittest import mock
+
+import pytest
+from app.middleware import ProfileStore, ProfilingMiddleware, StackSampler
+from app.views import download_profile, profiles
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import Http404, HttpResponse
+from django.test import RequestFactory, override_settings
+
+
+def slow_view(request):
+    time.sleep(0.05)
+    return HttpResponse("slow")
+
+
+def fast_view(request):
+    return HttpResponse("fast")
+
+
+@pytest.fixture
+def profiling_settings(tmp_path):
+    with override_settings(
+        PROFILING_ENABLED=True,
+        PROFILING_SAMPLE_RATE=0.0,
+        PROFILING_LATENCY_THRESHOLD=0.0,
+        PROFILING_TOKEN="secret",
+        PROFILING_INTERVAL=0.001,
+        PROFILING_DIR=str(tmp_path),
+        PROFILING_MAX_FILES=3,
+    ):
+        yield tmp_path
+
+
+def test_profiling_disabled():
+    with override_settings(PROFILING_ENABLED=False):
+        with pytest.raises(MiddlewareNotUsed):
+            ProfilingMiddleware(fast_view)
+
+
+@pytest.mark.parametrize(
+    "headers, n_profiles",
+    [
+        ({}, 0),
+        ({"HTTP_X_PROFILE_TOKEN": "wrong"}, 0),
+        ({"HTTP_X_PROFILE_TOKEN": "\xe9"}, 0),
+        ({"HTTP_X_PROFILE_TOKEN": "secret"}, 1),
+    ],
+)
+def test_profiling_header(profiling_settings, headers, n_profiles):
+    middleware = ProfilingMiddleware(slow_view)
+    response = middleware(RequestFactory().get("/login/", **headers))
+    assert response.content == b"slow"
+    stored = middleware.store.list()
+    assert len(stored) == n_profiles
+    if n_profiles:
+        assert stored[0]["reason"] == "header"
+        assert stored[0]["path"] == "/login/"
+        assert stored[0]["samples"] > 0
+
+
+def test_profiling_sample_rate(profiling_settings):
+    with override_settings(PROFILING_SAMPLE_RATE=1.0):
+        middleware = ProfilingMiddleware(fast_view)
+    middleware(RequestFactory().get("/login/"))
+    assert middleware.store.list() == []
+    middleware(RequestFactory().get("/"))
+    assert [p["reason"] for p in middleware.store.list()] == ["sample"]
+
+
+def test_profiling_latency_threshold(profiling_settings):
+    with override_settings(PROFILING_LATENCY_THRESHOLD=0.02):
+        fast = ProfilingMiddleware(fast_view)
+        slow = ProfilingMiddleware(slow_view)
+    fast(RequestFactory().get("/"))
+    assert fast.store.list() == []
+    slow(RequestFactory().get("/"))
+    stored = slow.store.list()
+    assert len(stored) == 1
+    assert stored[0]["reason"] == "latency"
+    assert stored[0]["duration"] >= 0.02
+    with open(profiling_settings / stored[0]["name"]) as f:
+        stacks = json.load(f)["stacks"]
+    assert any("slow_view (test_middleware.py" in stack for stack in stacks)
+
+
+def test_stack_sampler_collapse():
+    def inner():
+        import sys  # noqa: PLC0415
+
+        return StackSampler.collapse(sys._getframe())
+
+    stack = inner().split(";")
+    assert stack[-1].startswith("inner (test_middleware.py:")
+    assert stack[-2].startswith("test_stack_sampler_collapse (test_middleware.py:")
+
+
+def test_profile_store_ring(tmp_path):
+    store = ProfileStore(str(tmp_path), max_files=3)
+    names = [store.save({"path": f"/{i}"}, {"a;b": i}) for i in range(5)]
+    assert [p["name"] for p in store.list()] == names[:1:-1]
+    assert store.path(names[0]) is None
+    assert store.path(names[-1]) == str(tmp_path / names[-1])
+    assert store.path("../settings.json") is None
+
+
+def test_profile_views(profiling_settings):
+    store = ProfileStore(str(profiling_settings), max_files=3)
+    name = store.save({"path": "/", "method": "GET"}, {"a;b": 1})
+    request = RequestFactory().get("/profiles/")
+    request.user = mock.Mock(is_active=True, is_staff=True)
+
+    response = profiles(request)
+    assert response.status_code == 200
+    assert name in response.content.decode()
+
+    response = download_profile(request, name)
+    assert response.status_code == 200
+    assert json.loads(b"".join(response.streaming_content))["stacks"] == {"a;b": 1}
+    with pytest.raises(Http404):
+        download_profile(request, "missing.json")
+
+
+def test_profile_views_require_staff(profiling_settings):
+    request = RequestFactory().get("/profiles/")
+    request.user = mock.Mock(is_active=True, is_staff=False)
+    response = profiles(request)
+    assert response.status_code == 302
+    assert "/admin/login/" in response.url
@@ -0,0 +1,161 @@
+import threading
+import time
+
+import pytest
+from app.middleware import StackSampler
+from app.utils import ParserPipeline, iter_parsed_files, stream_parser
+from bam_masterdata.datamodel.object_types import Sem, Supplier
+from bam_masterdata.parsing import AbstractParser
+
+from tests.fake_openbis import FakeOpenbis, server
+
+
+class SemParser(AbstractParser):
+    """Adds a supplier and a SEM step (its child) per file, counting the files parsed."""
+
+    def __init__(self, fail_on=None):
+        self.parsed = 0
+        self.fail_on = fail_on
+
+    def parse(self, files, collection, logger):
+        for file in files:
+            if file == self.fail_on:
+                raise ValueError(f"Cannot parse {file}")
+            supplier_id = collection.add(Supplier(name=f"supplier {file}"))
+            sem_id = collection.add(Sem(name=f"sem {file}"))
+            collection.add_relationship(supplier_id, sem_id)
+            self.parsed += 1
+
+
+class SlowParser(AbstractParser):
+    """Keeps the CPU busy for a while on each file."""
+
+    def parse(self, files, collection, logger):
+        for _ in files:
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+
+@pytest.fixture
+def openbis():
+    server.reset()
+    server.add_user("user", "password")
+    o = FakeOpenbis()
+    o.login("user", "password")
+    return o
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i in range(10):
+        path = tmp_path / f"file{i}.txt"
+        path.write_text(f"content {i}")
+        paths.append(str(path))
+    return paths
+
+
+def stored(kind):
+    return [entity for entity in server.entities.values() if entity.kind == kind]
+
+
+def test_iter_parsed_files(files):
+    parser = SemParser()
+    parsed = iter_parsed_files({parser: files})
+    assert parser.parsed == 0
+    _, file, collection = next(parsed)
+    assert file == files[0]
+    assert parser.parsed == 1
+    assert len(collection.attached_objects) == 2
+
+
+def test_stream_parser(openbis, files):
+    parser = SemParser()
+    datasets = stream_parser(
+        openbis=openbis,
+        files_parser={parser: files},
+        space_name="USER",
+        project_name="project",
+        collection_name="collection",
+    )
+    objects = stored("object")
+    assert len(objects) == 2 * len(files)
+    assert all(o.parent == "/USER/PROJECT/COLLECTION" for o in objects)
+    assert sum(len(o.attributes.get("parents", [])) for o in objects) == len(files)
+    # files are uploaded in one dataset per parser
+    assert len(server.datasets) == 1
+    assert server.datasets[0].files == files
+    assert datasets == [(server.datasets[0], files)]
+
+
+def test_pipeline_backpressure(openbis, files):
+    parser = SemParser()
+    in_flight = []
+    new_object = openbis.new_object
+
+    def slow_new_object(**kwargs):
+        # files parsed but not yet written by the writer
+        in_flight.append(parser.parsed - len(stored("object")) // 2)
+        time.sleep(0.005)
+        return new_object(**kwargs)
+
+    openbis.new_object = slow_new_object
+    pipeline = ParserPipeline(
+        openbis, {parser: files}, "USER", "project", "collection", queue_size=2
+    )
+    pipeline.run()
+    assert parser.parsed == len(files)
+    # the queue, the file being written and the file being parsed
+    assert max(in_flight) <= 2 + 2
+
+
+def test_pipeline_parser_error(openbis, files):
+    parser = SemParser(fail_on=files[3])
+    pipeline = ParserPipeline(openbis, {parser: files}, "USER", "project", "collection")
+    with pytest.raises(ValueError, match="Cannot parse"):
+        pipeline.run()
+    # the files whose objects were written before the error are uploaded with them
+    assert len(stored("object")) == 2 * 3
+    assert len(server.datasets) == 1
+    assert server.datasets[0].files == files[:3]
+    assert pipeline.datasets == [(server.datasets[0], files[:3])]
+
+
+def test_pipeline_writer_error_stops_parsing(openbis, files):
+    parser = SemParser()
+
+    def failing_new_object(**kwargs):
+        raise RuntimeError("openBIS is down")
+
+    openbis.new_object = failing_new_object
+    pipeline = ParserPipeline(
+        openbis, {parser: files}, "USER", "project", "collection", queue_size=1
+    )
+    with pytest.raises(RuntimeError, match="openBIS is down"):
+        pipeline.run()
+    assert parser.parsed < len(files)
+    assert server.datasets == []
+    assert not any(t.name == "openbis-writer" for t in threading.enumerate())
+
+
+def test_stream_parser_is_profiled(openbis, files):
+    # the parser runs in the calling thread, the one sampled by the profiling middleware
+    sampler = StackSampler(interval=0.001)
+    thread_id = threading.get_ident()
+    sampler.start(thread_id)
+    try:
+        stream_parser(
+            openbis=openbis,
+            files_parser={SlowParser(): files},
+            space_name="USER",
+            project_name="project",
+        )
+    finally:
+        stacks = sampler.stop(thread_id)
+    parser_samples = sum(
+        count
+        for stack, count in stacks.items()
+        if "parse (test_pipeline.py" in stack.split(";")[-1]
+    )
+    assert parser_samples > sum(stacks.values()) / 2
@@ -0,0 +1,203 @@
+import hashlib
+import io
+import tarfile
+import time
+import zipfile
+import zlib
+
+import pytest
+from app.utils import (
+    FileLoader,
+    StreamingChecksum,
+    UploadVerifier,
+    compare_file,
+    stream_parser,
+)
+from bam_masterdata.parsing import AbstractParser
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from tests.fake_openbis import FakeDataSet, FakeOpenbis, server
+
+CONTENT = b"some content\n" * 1000
+
+
+@pytest.fixture(autouse=True)
+def reset_server():
+    server.reset()
+
+
+def checksums_of(content):
+    return {
+        "size": len(content),
+        "crc32": f"{zlib.crc32(content):x}",
+        "sha256": hashlib.sha256(content).hexdigest(),
+    }
+
+
+def save_dataset(tmp_path, names):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.write_bytes(CONTENT + name.encode())
+        paths.append(str(path))
+    dataset = FakeDataSet("RAW_DATA", paths, "user", "/USER/PROJECT")
+    dataset.save()
+    return dataset, paths
+
+
+def test_streaming_checksum():
+    checksum = StreamingChecksum()
+    for i in range(0, len(CONTENT), 1024):
+        checksum.update(CONTENT[i : i + 1024])
+    assert checksum.to_dict() == checksums_of(CONTENT)
+
+
+@pytest.mark.parametrize(
+    "content, remote, result",
+    [
+        (
+            CONTENT,
+            {"checksumType": "SHA256", "checksum": hashlib.sha256(CONTENT).hexdigest()},
+            (True, "sha256"),
+        ),
+        (CONTENT, {"checksumType": "SHA-256", "checksum": "0" * 64}, (False, "sha256")),
+        (CONTENT, {"checksumCRC32": f"{zlib.crc32(CONTENT):x}"}, (True, "crc32")),
+        (CONTENT, {"checksumCRC32": "1234abcd"}, (False, "crc32")),
+        (CONTENT, {"checksumCRC32": "0", "fileLength": len(CONTENT)}, (True, "size")),
+        (CONTENT, {"fileLength": 1}, (False, "size")),
+        (CONTENT, {"checksumCRC32": "0"}, (False, "size")),
+        # empty files are reported with a CRC32 and a length of 0
+        (b"", {"checksumCRC32": "0", "fileLength": 0}, (True, "size")),
+    ],
+)
+def test_compare_file(content, remote, result):
+    assert compare_file(checksums_of(content), remote) == result
+
+
+def test_file_loader_checksums():
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w") as zip_ref:
+        zip_ref.writestr("dir/a.txt", CONTENT)
+        zip_ref.writestr("dir/b.txt", b"not selected")
+    tar_buffer = io.BytesIO()
+    with tarfile.open(fileobj=tar_buffer, mode="w") as tar_ref:
+        info = tarfile.TarInfo("c.txt")
+        info.size = len(CONTENT)
+        tar_ref.addfile(info, io.BytesIO(CONTENT))
+    uploaded_files = [
+        SimpleUploadedFile("archive.zip", zip_buffer.getvalue()),
+        SimpleUploadedFile("archive.tar", tar_buffer.getvalue()),
+        SimpleUploadedFile("d.txt", CONTENT),
+    ]
+
+    file_loader = FileLoader(uploaded_files, ["dir/a.txt", "c.txt", "d.txt"])
+    saved_file_names = file_loader.load_files()
+    assert [name for name, _ in saved_file_names] == ["dir/a.txt", "c.txt", "d.txt"]
+    assert file_loader.checksums == {
+        path: checksums_of(CONTENT) for _, path in saved_file_names
+    }
+    for _, path in saved_file_names:
+        with open(path, "rb") as f:
+            assert f.read() == CONTENT
+
+
+@pytest.mark.parametrize(
+    "checksum_type, method", [(None, "crc32"), ("SHA256", "sha256")]
+)
+def test_upload_verifier(tmp_path, checksum_type, method):
+    server.checksum_type = checksum_type
+    dataset, paths = save_dataset(tmp_path, ["a.txt", "b.txt"])
+    checksums = {path: checksums_of(CONTENT + path[-5:].encode()) for path in paths}
+
+    verifier = UploadVerifier([(dataset, paths)], checksums)
+    results = verifier.verify()
+    assert [r["status"] for r in results] == ["ok", "ok"]
+    assert {r["detail"] for r in results} == {method}
+    assert [log["level"] for log in verifier.logs()] == ["info"]
+
+
+def test_upload_verifier_failures(tmp_path):
+    dataset, paths = save_dataset(tmp_path, ["a.txt", "b.txt", "c.txt"])
+    checksums = {path: checksums_of(CONTENT + path[-5:].encode()) for path in paths}
+    # a.txt was corrupted, b.txt never reached the datastore, and c.txt has no local checksums
+    dataset.file_crc32["a.txt"] = "1234abcd"
+    del dataset.file_sizes["b.txt"]
+    del checksums[paths[2]]
+
+    verifier = UploadVerifier([(dataset, paths)], checksums)
+    results = verifier.verify()
+    assert [r["status"] for r in results] == ["mismatch", "missing", "unverified"]
+    logs = verifier.logs()
+    assert [log["level"] for log in logs] == ["error", "error", "warning"]
+    assert (
+        logs[0]["event"]
+        == f"[{dataset.permId}] a.txt does not match the uploaded file (crc32)"
+    )
+
+
+def test_upload_verifier_datastore_error(tmp_path):
+    dataset, paths = save_dataset(tmp_path, ["a.txt"])
+
+    def get_dataset_files():
+        raise ConnectionError("datastore unreachable")
+
+    dataset.get_dataset_files = get_dataset_files
+    results = UploadVerifier([(dataset, paths)], {}).verify()
+    assert results == [
+        {
+            "file": "a.txt",
+            "dataset": dataset.permId,
+            "status": "error",
+            "detail": "datastore unreachable",
+        }
+    ]
+
+
+def test_upload_verifier_is_concurrent(tmp_path):
+    server.latency = 0.2
+    datasets = []
+    checksums = {}
+    for i in range(4):
+        (tmp_path / str(i)).mkdir()
+        dataset, paths = save_dataset(tmp_path / str(i), [f"{i}.txt"])
+        datasets.append((dataset, paths))
+        checksums[paths[0]] = checksums_of(CONTENT + f"{i}.txt".encode())
+
+    start = time.perf_counter()
+    results = UploadVerifier(datasets, checksums, max_workers=4).verify()
+    assert time.perf_counter() - start < 4 * server.latency
+    assert [r["status"] for r in results] == ["ok"] * 4
+
+
+def test_upload_verifier_dataset_not_saved(tmp_path):
+    class NoopParser(AbstractParser):
+        def parse(self, files, collection, logger):
+            pass
+
+    def failing_new_dataset(**kwargs):
+        raise ConnectionError("datastore unreachable")
+
+    server.add_user("user", "password")
+    openbis = FakeOpenbis()
+    openbis.login("user", "password")
+    openbis.new_dataset = failing_new_dataset
+    paths = []
+    for name in ["a.txt", "b.txt"]:
+        (tmp_path / name).write_bytes(CONTENT)
+        paths.append(str(tmp_path / name))
+
+    datasets = stream_parser(
+        openbis=openbis,
+        files_parser={NoopParser(): paths},
+        space_name="USER",
+        project_name="project",
+        collection_name="collection",
+    )
+    assert datasets == []
+    checksums = {path: checksums_of(CONTENT) for path in paths}
+    verifier = UploadVerifier(datasets, checksums, files=paths)
+    assert [r["status"] for r in verifier.verify()] == ["missing", "missing"]
+    assert [log["event"] for log in verifier.logs()] == [
+        "[no dataset] a.txt is missing in the datastore",
+        "[no dataset] b.txt is missing in the datastore",
+    ]
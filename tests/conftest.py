@@ -2,6 +2,10 @@ import os
 
 import pytest
 
+from .utils import configure_django
+
+configure_django()
+
 if os.getenv("_PYTEST_RAISE", "0") != "0":
 
     @pytest.hookimpl(tryfirst=True)
@@ -0,0 +1,198 @@
+"""
+In-process stand-in for `pybis.Openbis`, used to exercise the app without an openBIS instance.
+
+The `Openbis` objects are pickled by the Django cache, so they only hold the URL and the logged in
+user. Everything that is stored "server side" lives in the module-level `server`.
+"""
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+import zlib
+
+from pandas import DataFrame
+
+
+class FakeOpenbisServer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.users = {}
+            self.entities = {}
+            self.datasets = []
+            # Checksum reported for the dataset files besides CRC32 (e.g., "SHA256"), if any
+            self.checksum_type = None
+            # Time in seconds taken by the datastore to list the files of a dataset
+            self.latency = 0.0
+
+    def add_user(self, username, password):
+        with self.lock:
+            self.users[username] = password
+
+    def store(self, entity):
+        with self.lock:
+            self.entities[entity.identifier] = entity
+
+    def store_dataset(self, dataset):
+        with self.lock:
+            self.datasets.append(dataset)
+
+    def get(self, identifier):
+        with self.lock:
+            return self.entities.get(identifier)
+
+    def children(self, parent_identifier, kind):
+        with self.lock:
+            return [
+                entity
+                for entity in self.entities.values()
+                if entity.kind == kind and entity.parent == parent_identifier
+            ]
+
+
+server = FakeOpenbisServer()
+
+
+class FakeEntity:
+    def __init__(self, kind, code, parent="", username="", **attributes):
+        self.kind = kind
+        self.code = code.upper()
+        self.parent = parent
+        self.identifier = f"{parent}/{self.code}"
+        self.username = username
+        self.attributes = attributes
+
+    def save(self):
+        server.store(self)
+
+    def add_parents(self, parent_identifier):
+        self.attributes.setdefault("parents", []).append(parent_identifier)
+
+    def set_props(self, props):
+        self.attributes.setdefault("props", {}).update(props)
+
+    def get_collections(self):
+        return server.children(self.identifier, "collection")
+
+    def __str__(self):
+        return self.code
+
+
+class FakeSpace(FakeEntity):
+    def __init__(self, code, username=""):
+        super().__init__("space", code, username=username)
+
+    def get_projects(self):
+        return server.children(self.identifier, "project")
+
+    def get_project(self, code):
+        return server.get(f"{self.identifier}/{code.upper()}")
+
+    def new_project(self, code, description=""):
+        return FakeEntity(
+            "project", code, self.identifier, self.username, description=description
+        )
+
+    def get_collection(self, identifier):
+        return server.get(identifier.upper())
+
+    def get_object(self, identifier):
+        return server.get(identifier.upper())
+
+
+class FakeDataSet:
+    def __init__(self, type, files, username, parent):
+        self.type = type
+        self.files = list(files)
+        self.username = username
+        self.parent = parent
+        self.permId = None
+        self.file_sizes = {}
+        self.file_checksums = {}
+        self.file_crc32 = {}
+
+    def save(self):
+        # The files are read on save, as the app removes them right after `stream_parser` returns
+        for path in self.files:
+            with open(path, "rb") as f:
+                content = f.read()
+            name = os.path.basename(path)
+            self.file_sizes[name] = len(content)
+            self.file_checksums[name] = hashlib.sha256(content).hexdigest()
+            self.file_crc32[name] = f"{zlib.crc32(content):x}"
+        self.permId = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().int % 10**6}"
+        server.store_dataset(self)
+
+    def get_dataset_files(self):
+        """List the stored files with the columns used by `pybis`."""
+        time.sleep(server.latency)
+        rows = [
+            {
+                "dataSetPermId": self.permId,
+                "path": f"original/{name}",
+                "directory": False,
+                "fileLength": size,
+                "checksumCRC32": self.file_crc32[name],
+                "checksum": self.file_checksums[name] if server.checksum_type else None,
+                "checksumType": server.checksum_type,
+            }
+            for name, size in self.file_sizes.items()
+        ]
+        return FakeThings(DataFrame(rows))
+
+
+class FakeThings:
+    """Result of a search in `pybis`, exposing the found entities as a DataFrame in `df`."""
+
+    def __init__(self, df):
+        self.df = df
+
+
+class FakeOpenbis:
+    """Drop-in replacement for `pybis.Openbis` backed by the in-process `server`."""
+
+    def __init__(self, url=None, **kwargs):
+        self.url = url
+        self.username = None
+
+    def login(self, username, password, save_token=False):
+        if server.users.get(username) != password:
+            raise ValueError("login to openBIS failed")
+        self.username = username
+        space = FakeSpace(username, username)
+        if not server.get(space.identifier):
+            space.save()
+
+    def get_spaces(self):
+        return [server.get(f"/{self.username.upper()}")]
+
+    def get_space(self, code):
+        if space := server.get(f"/{code.upper()}"):
+            return space
+        raise ValueError(f"Space {code} not found")
+
+    def new_collection(self, code, type, project):
+        return FakeEntity(
+            "collection", code, project.identifier, self.username, type=type
+        )
+
+    def new_object(self, type, space, project, collection=None, props=None):
+        parent = (collection or project).identifier
+        with server.lock:
+            code = f"{type}{len(server.entities)}"
+        return FakeEntity(
+            "object", code, parent, self.username, type=type, props=props or {}
+        )
+
+    def get_object(self, identifier):
+        return server.get(identifier)
+
+    def new_dataset(self, type, files, collection=None, project=None):
+        return FakeDataSet(
+            type, files, self.username, (collection or project).identifier
+        )
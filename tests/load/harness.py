@@ -0,0 +1,390 @@
+"""
+Load-test harness simulating several users working with the app at the same time.
+
+Each simulated user logs in, uploads a zip archive and assigns a parser to its files, against an
+in-process openBIS stand-in (`tests.fake_openbis`). The users are driven either through the WSGI
+handler (one thread per user, like a threaded worker) or through the ASGI handler (one task per user
+on a single event loop). Afterwards, the sessions and the data stored in the stand-in are checked
+for anything that belongs to another user.
+
+Run it from the repository root with, e.g.:
+
+    python -m tests.load.harness --users 50 --files 5 --interface asgi
+"""
+
+import argparse
+import asyncio
+import io
+import re
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from importlib import import_module
+from unittest import mock
+
+from bam_masterdata.parsing import AbstractParser
+
+from tests.fake_openbis import FakeOpenbis, server
+from tests.utils import configure_django
+
+PARSER_NAME = "LoadTestParser"
+
+USER_TAG = re.compile(r"user\d{3}")
+
+
+class LoadTestParser(AbstractParser):
+    """Parser that only logs the files it is given, optionally taking some time for each of them."""
+
+    delay = 0.0
+
+    def parse(self, files, collection, logger):
+        for file in files:
+            time.sleep(self.delay)
+            logger.info(f"Parsing {file}")
+
+
+LOAD_TEST_PARSERS = {
+    "load_test_parser_entry_point": {
+        "name": PARSER_NAME,
+        "description": "A parser used by the load-test harness.",
+        "parser_class": LoadTestParser,
+    }
+}
+
+
+@dataclass
+class LoadReport:
+    """Results of a load-test run."""
+
+    interface: str
+    users: int
+    duration: float = 0.0
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+    errors: list[str] = field(default_factory=list)
+    leaks: list[str] = field(default_factory=list)
+
+    @property
+    def requests(self) -> int:
+        return sum(len(values) for values in self.latencies.values())
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.duration if self.duration else 0.0
+
+    def percentile(self, q: float, step: str = "") -> float:
+        """
+        Latency percentile in seconds.
+
+        Args:
+            q (float): The percentile to compute, between 0 and 100.
+            step (str): The name of the step to restrict to. All requests are used if empty.
+
+        Returns:
+            float: The latency below which `q` percent of the requests finished.
+        """
+        values = sorted(
+            self.latencies.get(step, [])
+            if step
+            else [value for values in self.latencies.values() for value in values]
+        )
+        if not values:
+            return 0.0
+        # Linear interpolation between the closest ranks
+        rank = (len(values) - 1) * min(max(q, 0), 100) / 100
+        lower = int(rank)
+        upper = min(lower + 1, len(values) - 1)
+        return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+    def summary(self) -> str:
+        lines = [
+            f"{self.interface.upper()}: {self.users} users, {self.requests} requests "
+            f"in {self.duration:.2f} s ({self.throughput:.1f} req/s)",
+            f"{'step':<16}{'p50 [ms]':>10}{'p95 [ms]':>10}{'p99 [ms]':>10}{'max [ms]':>10}",
+        ]
+        for step in [*self.latencies, ""]:
+            values = self.latencies.get(step) or [
+                value for values in self.latencies.values() for value in values
+            ]
+            lines.append(
+                f"{step or 'all':<16}"
+                + "".join(
+                    f"{1000 * value:>10.1f}"
+                    for value in (
+                        self.percentile(50, step),
+                        self.percentile(95, step),
+                        self.percentile(99, step),
+                        max(values, default=0.0),
+                    )
+                )
+            )
+        lines.append(f"errors: {len(self.errors)}")
+        lines.extend(f"  {error}" for error in self.errors)
+        lines.append(f"leaks: {len(self.leaks)}")
+        lines.extend(f"  {leak}" for leak in self.leaks)
+        return "\n".join(lines)
+
+
+class SimulatedUser:
+    """A user going through login, upload and parser assignment."""
+
+    def __init__(self, index: int, n_files: int):
+        self.username = f"user{index:03d}"
+        self.password = f"{self.username}-password"
+        self.space = self.username.upper()
+        self.file_names = [
+            f"{self.username}/{self.username}-{i}.txt" for i in range(n_files)
+        ]
+
+    def archive(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zip_ref:
+            for name in self.file_names:
+                zip_ref.writestr(name, f"{name}\n" * 64)
+        buffer.seek(0)
+        buffer.name = f"{self.username}.zip"
+        return buffer
+
+    def steps(self) -> list[tuple[str, str, str, dict, int]]:
+        """
+        Requests made by the user, in order.
+
+        Returns:
+            list: Tuples of step name, HTTP method, path, POST data and expected status code.
+        """
+        return [
+            ("login_page", "get", "/login/", {}, 200),
+            (
+                "login",
+                "post",
+                "/login/",
+                {"username": self.username, "password": self.password},
+                302,
+            ),
+            ("homepage", "get", "/", {}, 200),
+            (
+                "upload",
+                "post",
+                "/",
+                {
+                    "upload": "1",
+                    "selected_space": self.space,
+                    "project_name": "LOAD_TEST",
+                    "collection_name": "LOAD_TEST_COLLECTION",
+                    "files[]": self.archive(),
+                    "selected_files": ",".join(self.file_names),
+                },
+                302,
+            ),
+            (
+                "assign_parsers",
+                "post",
+                "/",
+                {
+                    "assign_parsers": "1",
+                    **{
+                        f"parser_type_{idx}": PARSER_NAME
+                        for idx in range(len(self.file_names))
+                    },
+                },
+                302,
+            ),
+            ("results", "get", "/", {}, 200),
+        ]
+
+    def check_leaks(self, session) -> list[str]:
+        """
+        Look for state of other users in the session and in the data stored in openBIS.
+
+        Args:
+            session: The session store of the user once all the steps have run.
+
+        Returns:
+            list[str]: Descriptions of the leaks found.
+        """
+        leaks = []
+        if (username := session.get("openbis_username")) != self.username:
+            leaks.append(f"{self.username}: session belongs to {username}")
+
+        events = [log["event"] for log in session.get("checker_logs") or []]
+        foreign = {
+            tag
+            for event in events
+            for tag in USER_TAG.findall(event)
+            if tag != self.username
+        }
+        if foreign:
+            leaks.append(f"{self.username}: logs of {sorted(foreign)} shown")
+        missing = [
+            name
+            for name in self.file_names
+            if not any(name.split("/")[-1] in event for event in events)
+        ]
+        if missing:
+            leaks.append(f"{self.username}: logs for {missing} missing")
+
+        for dataset in server.datasets:
+            owners = {USER_TAG.match(name).group() for name in dataset.file_sizes}
+            if dataset.username == self.username and owners != {self.username}:
+                leaks.append(
+                    f"{self.username}: dataset {dataset.parent} holds files of {sorted(owners)}"
+                )
+            elif self.username in owners and not dataset.parent.startswith(
+                f"/{self.space}/"
+            ):
+                leaks.append(
+                    f"{self.username}: files stored in {dataset.parent} by {dataset.username}"
+                )
+        return leaks
+
+    def check_verification(self, session) -> list[str]:
+        """
+        Look for uploaded files that do not match what reached the openBIS datastore.
+
+        Args:
+            session: The session store of the user once all the steps have run.
+
+        Returns:
+            list[str]: The errors shown in the checker logs.
+        """
+        return [
+            f"{self.username}: {log['event']}"
+            for log in session.get("checker_logs") or []
+            if log.get("level") == "danger"
+        ]
+
+
+def _load_session(client):
+    from django.conf import settings  # noqa: PLC0415
+
+    engine = import_module(settings.SESSION_ENGINE)
+    cookie = client.cookies.get(settings.SESSION_COOKIE_NAME)
+    return engine.SessionStore(cookie.value if cookie else None)
+
+
+def _check_response(user, step, response, expected_status, report):
+    if response.status_code != expected_status:
+        report.errors.append(
+            f"{user.username} {step}: status {response.status_code} (expected {expected_status})"
+        )
+        return False
+    return True
+
+
+def _run_wsgi_user(user, report, barrier, lock):
+    from django.test import Client  # noqa: PLC0415
+
+    client = Client(raise_request_exception=False)
+    barrier.wait()
+    for step, method, path, data, expected_status in user.steps():
+        start = time.perf_counter()
+        response = getattr(client, method)(path, data)
+        elapsed = time.perf_counter() - start
+        with lock:
+            report.latencies.setdefault(step, []).append(elapsed)
+            if not _check_response(user, step, response, expected_status, report):
+                return client
+    return client
+
+
+async def _run_asgi_user(user, report):
+    from django.test import AsyncClient  # noqa: PLC0415
+
+    client = AsyncClient(raise_request_exception=False)
+    for step, method, path, data, expected_status in user.steps():
+        start = time.perf_counter()
+        response = await getattr(client, method)(path, data)
+        report.latencies.setdefault(step, []).append(time.perf_counter() - start)
+        if not _check_response(user, step, response, expected_status, report):
+            break
+    return client
+
+
+async def _run_asgi_users(users, report):
+    return await asyncio.gather(*(_run_asgi_user(user, report) for user in users))
+
+
+def run_load_test(
+    users: int = 10,
+    files: int = 3,
+    interface: str = "wsgi",
+    parse_delay: float = 0.0,
+) -> LoadReport:
+    """
+    Simulate `users` users logging in, uploading and assigning parsers concurrently.
+
+    Args:
+        users (int): Number of concurrent users.
+        files (int): Number of files in the archive uploaded by each user.
+        interface (str): Either `wsgi` or `asgi`.
+        parse_delay (float): Time in seconds the parser takes for each file.
+
+    Returns:
+        LoadReport: Throughput, latencies, errors and leaks found during the run.
+    """
+    if interface not in ("wsgi", "asgi"):
+        raise ValueError(f"Unknown interface '{interface}', use 'wsgi' or 'asgi'.")
+    configure_django()
+    from django.core.cache import cache  # noqa: PLC0415
+
+    server.reset()
+    cache.clear()
+    simulated_users = [SimulatedUser(index, files) for index in range(users)]
+    for user in simulated_users:
+        server.add_user(user.username, user.password)
+
+    report = LoadReport(interface=interface, users=users)
+    with (
+        mock.patch("pybis.Openbis", FakeOpenbis),
+        mock.patch(
+            "app.utils.utils.get_entry_point_parsers", return_value=LOAD_TEST_PARSERS
+        ),
+        mock.patch.object(LoadTestParser, "delay", parse_delay),
+    ):
+        start = time.perf_counter()
+        if interface == "wsgi":
+            barrier = threading.Barrier(users)
+            lock = threading.Lock()
+            with ThreadPoolExecutor(max_workers=users) as executor:
+                clients = list(
+                    executor.map(
+                        lambda user: _run_wsgi_user(user, report, barrier, lock),
+                        simulated_users,
+                    )
+                )
+        else:
+            clients = asyncio.run(_run_asgi_users(simulated_users, report))
+        report.duration = time.perf_counter() - start
+
+    for user, client in zip(simulated_users, clients):
+        session = _load_session(client)
+        report.leaks.extend(user.check_leaks(session))
+        report.errors.extend(user.check_verification(session))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--files", type=int, default=3)
+    parser.add_argument("--interface", choices=["wsgi", "asgi", "both"], default="both")
+    parser.add_argument("--parse-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    interfaces = ["wsgi", "asgi"] if args.interface == "both" else [args.interface]
+    failed = False
+    for interface in interfaces:
+        report = run_load_test(
+            users=args.users,
+            files=args.files,
+            interface=interface,
+            parse_delay=args.parse_delay,
+        )
+        print(report.summary())
+        failed = failed or bool(report.errors or report.leaks)
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import pytest
+
+from tests.fake_openbis import server
+from tests.load.harness import LoadReport, SimulatedUser, run_load_test
+
+
+@pytest.mark.parametrize("interface", ["wsgi", "asgi"])
+def test_run_load_test(interface):
+    report = run_load_test(users=8, files=3, interface=interface)
+    assert report.errors == []
+    assert report.leaks == []
+    assert report.requests == 8 * 6
+    assert report.throughput > 0
+    assert 0 < report.percentile(50) <= report.percentile(99)
+    assert len(server.datasets) == 8
+
+
+def test_run_load_test_unknown_interface():
+    with pytest.raises(ValueError):
+        run_load_test(interface="cgi")
+
+
+def test_check_leaks():
+    user = SimulatedUser(1, 2)
+    session = {
+        "openbis_username": "user002",
+        "checker_logs": [
+            {"event": "[LoadTestParser] Parsed: user001-0.txt"},
+            {"event": "[LoadTestParser] Parsed: user002-0.txt"},
+        ],
+    }
+    server.reset()
+    leaks = user.check_leaks(session)
+    assert leaks == [
+        "user001: session belongs to user002",
+        "user001: logs of ['user002'] shown",
+        "user001: logs for ['user001/user001-1.txt'] missing",
+    ]
+
+
+def test_check_verification():
+    user = SimulatedUser(1, 2)
+    session = {
+        "checker_logs": [
+            {
+                "event": "Verified 1 file(s) against the datastore (crc32).",
+                "level": "info",
+            },
+            {
+                "event": "[no dataset] user001-1.txt is missing in the datastore",
+                "level": "danger",
+            },
+        ]
+    }
+    assert user.check_verification(session) == [
+        "user001: [no dataset] user001-1.txt is missing in the datastore"
+    ]
+
+
+def test_load_report_percentile():
+    report = LoadReport(
+        interface="wsgi", users=1, latencies={"login": [0.1, 0.2, 0.3, 0.4]}
+    )
+    assert report.percentile(50, "login") == pytest.approx(0.25)
+    assert report.percentile(100, "login") == pytest.approx(0.4)
+    assert report.percentile(50, "upload") == 0.0
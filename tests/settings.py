@@ -0,0 +1,25 @@
+"""
+Django settings used by the tests. They extend the project settings, keeping the sessions in the
+cache (so no database is needed) and logging only to the console (so no `debug.log` is written).
+"""
+
+from uploader.settings import *  # noqa: F403
+
+SESSION_ENGINE = "django.contrib.sessions.backends.cache"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {
+            "level": "WARNING",
+            "class": "logging.StreamHandler",
+        },
+    },
+    "loggers": {
+        "django": {
+            "handlers": ["console"],
+            "level": "WARNING",
+        },
+    },
+}
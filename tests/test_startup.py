@@ -0,0 +1,90 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from .utils import PROJECT_DIR, ROOT_DIR, TEST_ENVIRON
+
+# Budgets for booting the WSGI application and loading the URLconf (and hence the views) in a fresh
+# interpreter. They are generous on purpose: the goal is to catch heavy imports sneaking back into
+# module level, not to benchmark the machine running the tests.
+IMPORT_TIME_BUDGET = 1.0  # seconds
+RSS_BUDGET = 96 * 1024  # KiB
+
+DEFERRED_MODULES = [
+    "pybis",
+    "cryptography.fernet",
+    "bam_masterdata.cli.cli",
+    "bam_masterdata.metadata.entities",
+]
+
+STARTUP_SCRIPT = """
+import json
+import resource
+import sys
+import time
+
+start = time.perf_counter()
+from uploader.wsgi import application
+from django.urls import get_resolver
+
+get_resolver().url_patterns
+elapsed = time.perf_counter() - start
+
+# `ru_maxrss` is inherited from the parent process on Linux, so prefer the peak RSS of this process
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+try:
+    with open("/proc/self/status") as f:
+        rss = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+except OSError:
+    pass
+
+print(json.dumps({"elapsed": elapsed, "rss": rss, "modules": sorted(sys.modules)}))
+"""
+
+
+def measure_startup() -> dict:
+    """
+    Boot the WSGI application in a fresh interpreter and report how long it took, its peak RSS and
+    the modules it imported.
+
+    Returns:
+        dict: A dictionary with the keys `elapsed` (seconds), `rss` (KiB) and `modules`.
+    """
+    env = {
+        **TEST_ENVIRON,
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "uploader.settings",
+        "PYTHONPATH": os.pathsep.join(
+            filter(None, [str(ROOT_DIR), os.environ.get("PYTHONPATH")])
+        ),
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        cwd=PROJECT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.fixture(scope="module")
+def startup():
+    return measure_startup()
+
+
+@pytest.mark.parametrize("module", DEFERRED_MODULES)
+def test_heavy_modules_are_deferred(startup, module):
+    assert module not in startup["modules"]
+
+
+def test_startup_import_time(startup):
+    assert startup["elapsed"] < IMPORT_TIME_BUDGET
+
+
+def test_startup_rss(startup):
+    assert startup["rss"] < RSS_BUDGET
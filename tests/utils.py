@@ -0,0 +1,30 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+PROJECT_DIR = ROOT_DIR / "openbis_upload_helper"
+
+# Environment needed to import the Django settings without a `settings.ini`
+TEST_ENVIRON = {
+    "SECRET_KEY": "test-secret-key",
+    "SECRET_ENCRYPTION_KEY": "x1_JDNmuikh7MQFzIQJFvmJDFbeOsacJRvvvwq3xv6a=",
+    "ALLOWED_HOSTS": "127.0.0.1,localhost,testserver",
+    "CSRF_TRUSTED_ORIGINS": "http://localhost",
+    "DJANGO_SETTINGS_MODULE": "tests.settings",
+}
+
+
+def configure_django() -> None:
+    """
+    Make the Django project importable the same way `manage.py` does and set up Django with the
+    test settings defined in `tests/settings.py`.
+    """
+    import django  # noqa: PLC0415
+
+    for key, value in TEST_ENVIRON.items():
+        os.environ.setdefault(key, value)
+    for path in (str(ROOT_DIR), str(PROJECT_DIR)):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    django.setup()